@@ -10,21 +10,29 @@
 
 from __future__ import annotations
 
+import functools
+import hashlib
+import importlib.util
 import io
+import itertools
 from typing import Dict, List, Tuple
 import json
+import re
 
 import pandas as pd
 import numpy as np
+import plotly.graph_objects as go
 import streamlit as st
 
-# Google Sheets integration using gspread
-try:
-    import gspread
-    from google.oauth2.service_account import Credentials
-    GSHEETS_AVAILABLE = True
-except ImportError:
-    GSHEETS_AVAILABLE = False
+# Copy-on-Write: frames shared between session state and the render are only
+# copied when something actually writes to them (always on, and the option
+# deprecated, from pandas 3)
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+# Google Sheets integration using gspread; imported lazily when enabled
+# (gspread depends on google-auth, so one spec check covers both)
+GSHEETS_AVAILABLE = importlib.util.find_spec("gspread") is not None
 
 # -------------------------------
 # Styling
@@ -374,6 +382,202 @@ html, body, [data-testid="stAppViewContainer"] {
 </style>
 """
 
+
+@st.cache_resource(show_spinner=False)
+def minify_css(css: str) -> str:
+    """Strip comments and redundant whitespace from a <style> block."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    return re.sub(r"\s*([{}:;,])\s*", r"\1", css).strip()
+
+
+# Streamlit re-executes this script on every rerun, so the minified text is
+# kept in a resource cache rather than recomputed each run. It is still
+# emitted on every run: Streamlit removes any element a rerun does not
+# re-emit, so a one-shot injection would lose the styling after the first
+# interaction.
+CSS = minify_css(CSS)
+
+# Dashboard tab styles
+DASH_CSS = minify_css("""
+<style>
+.dash-section {
+    background: white;
+    border-radius: 12px;
+    padding: 24px;
+    margin-bottom: 24px;
+    box-shadow: 0 1px 3px rgba(0,0,0,0.1);
+}
+.dash-title {
+    font-size: 20px;
+    font-weight: 700;
+    color: #1e293b;
+    margin-bottom: 8px;
+    display: flex;
+    align-items: center;
+    gap: 8px;
+}
+.dash-subtitle {
+    font-size: 14px;
+    color: #64748b;
+    margin-bottom: 20px;
+}
+.employee-grid {
+    display: grid;
+    grid-template-columns: 140px repeat(12, 1fr);
+    gap: 6px;
+    margin-bottom: 8px;
+    align-items: stretch;
+}
+.emp-header {
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    color: white;
+    padding: 10px 8px;
+    border-radius: 8px;
+    text-align: center;
+    font-weight: 600;
+    font-size: 12px;
+}
+.emp-name {
+    background: #f8fafc;
+    padding: 10px 12px;
+    border-radius: 8px;
+    font-weight: 600;
+    font-size: 13px;
+    color: #1e293b;
+    display: flex;
+    align-items: center;
+}
+.emp-cell {
+    background: white;
+    border: 2px solid #e2e8f0;
+    border-radius: 6px;
+    padding: 8px 6px;
+    text-align: center;
+    font-size: 11px;
+    font-weight: 700;
+    min-height: 50px;
+    display: flex;
+    flex-direction: column;
+    align-items: center;
+    justify-content: center;
+    gap: 4px;
+}
+.emp-cell.low { background: #f0fdf4; color: #15803d; border-color: #86efac; }
+.emp-cell.medium { background: #fef3c7; color: #b45309; border-color: #fcd34d; }
+.emp-cell.high { background: #fee2e2; color: #b91c1c; border-color: #fca5a5; }
+.emp-cell.over { background: #dc2626; color: white; border-color: #991b1b; box-shadow: 0 0 0 3px rgba(220, 38, 38, 0.2); }
+.emp-proj {
+    font-size: 9px;
+    background: rgba(0, 0, 0, 0.1);
+    padding: 2px 5px;
+    border-radius: 3px;
+    font-weight: 600;
+    white-space: nowrap;
+}
+.emp-cell.over .emp-proj {
+    background: rgba(255,255,255,0.3);
+}
+.legend {
+    display: flex;
+    gap: 16px;
+    font-size: 12px;
+    margin-top: 12px;
+    flex-wrap: wrap;
+}
+.legend-item {
+    display: flex;
+    align-items: center;
+    gap: 6px;
+}
+.legend-box {
+    width: 16px;
+    height: 16px;
+    border-radius: 3px;
+    border: 2px solid;
+}
+.summary-grid {
+    display: grid;
+    grid-template-columns: repeat(3, 1fr);
+    gap: 20px;
+}
+.summary-card {
+    background: white;
+    border: 1px solid #e2e8f0;
+    border-radius: 12px;
+    padding: 20px;
+}
+.summary-card h4 {
+    font-size: 16px;
+    font-weight: 600;
+    color: #334155;
+    margin-bottom: 16px;
+}
+.metric-row {
+    display: grid;
+    grid-template-columns: repeat(2, 1fr);
+    gap: 12px;
+    margin-bottom: 12px;
+}
+.metric-box {
+    background: #f8fafc;
+    padding: 14px;
+    border-radius: 8px;
+    border: 1px solid #e2e8f0;
+}
+.metric-label {
+    font-size: 11px;
+    color: #64748b;
+    text-transform: uppercase;
+    letter-spacing: 0.5px;
+    margin-bottom: 4px;
+}
+.metric-value {
+    font-size: 28px;
+    font-weight: 700;
+    color: #1e293b;
+    line-height: 1;
+}
+.metric-change {
+    font-size: 11px;
+    margin-top: 4px;
+}
+.metric-change.up { color: #10b981; }
+.metric-change.down { color: #ef4444; }
+</style>
+""")
+
+# Yearly timeline cell templates (filled with str.format_map)
+BAR_TMPL = (
+    "<div class='month-bar'>"
+    "<div class='tooltip-container'>"
+    "<div class='bar {cls}' style='height:{height}%'>{bar_value}</div>"
+    "{tooltip}"
+    "</div>"
+    "</div>"
+)
+TOOLTIP_TMPL = (
+    "<span class='tooltip-text'>"
+    "<div class='tooltip-label'>Project</div>"
+    "<div class='tooltip-value'>{proj}</div>"
+    "<div class='tooltip-divider'></div>"
+    "<div class='tooltip-label'>Phase</div>"
+    "<div class='tooltip-value'>{phase}</div>"
+    "<div class='tooltip-divider'></div>"
+    "<div class='tooltip-label'>Total Effort</div>"
+    "<div class='tooltip-value'>{bar_value} MM</div>"
+    "<div class='tooltip-divider'></div>"
+    "<div class='tooltip-label'>Team Allocation</div>"
+    "{employee_lines}"
+    "</span>"
+)
+EMP_LINE_TMPL = "<div class='tooltip-value'>• {name} ({mm}) MM</div>"
+
+# Utilization grid: pct bins -> class (0 | (0,50) | [50,75) | [75,100] | >100)
+UTIL_BINS = np.array([np.nextafter(0.0, 1.0), 50.0, 75.0, np.nextafter(100.0, np.inf)])
+UTIL_CLASSES = ("", "low", "medium", "high", "over")
+EMP_CELL_TMPL = "<div class='emp-cell {cls}'><span style='font-weight:700;'>{text}</span>{proj_tags}</div>"
+
 # -------------------------------
 # Sample data (if user doesn't upload)
 # -------------------------------
@@ -393,15 +597,29 @@ SAMPLE_PROJECTS = [
 
 PHASES = ["Planning", "Design", "Development", "Testing", "Delivery"]
 
+# One "Name (mm)" token of an Employees cell, e.g. "Alex Morgan (2.0)"
+EMP_RE = re.compile(r"([^,()]+?)\s*\(\s*(\d*\.?\d+)\s*\)")
+
+# lowercased phase -> (css class, label)
+_PHASE_MAP = {
+    "planning": ("plan", "Planning"),
+    "design": ("design", "Design"),
+    "development": ("dev", "Development"),
+    "testing": ("test", "Testing"),
+    "delivery": ("deliv", "Delivery"),
+}
+_PHASE_CLASS = {k: c for k, (c, _) in _PHASE_MAP.items()}
+_BADGE_HTML = {k: f"<span class='badge {c}'>{t}</span>" for k, (c, t) in _PHASE_MAP.items()}
+_PHASE_CELL = {k: f"<div class='cell {c}'>{t}</div>" for k, (c, t) in _PHASE_MAP.items()}
+_IDLE_HTML = "<div class='cell idle'>Idle</div>"
+
 
-def yms(start_ym: str, n: int) -> List[str]:
+def yms(start_ym: str, n: int) -> Tuple[str, ...]:
+    """Return n consecutive "YYYY-MM" labels starting at start_ym."""
+    # split on "-" like the old divmod loop, so unpadded months ("2025-3") still work
     y, m = map(int, start_ym.split("-"))
-    out = []
-    for i in range(n):
-        yy = y + (m - 1 + i) // 12
-        mm = (m - 1 + i) % 12 + 1
-        out.append(f"{yy:04d}-{mm:02d}")
-    return out
+    base = np.datetime64(f"{y:04d}-01", "M") + (m - 1)
+    return tuple(np.datetime_as_string(base + np.arange(n)).tolist())
 
 
 def sample_frames(start_ym="2025-01") -> Tuple[pd.DataFrame, pd.DataFrame]:
@@ -416,30 +634,35 @@ def sample_frames(start_ym="2025-01") -> Tuple[pd.DataFrame, pd.DataFrame]:
     }
     
     # Allocations with employee assignments
-    months = yms(start_ym, 12)
-    rows = []
+    months = np.array(yms(start_ym, 12))
     rng = np.random.default_rng(7)
-    for proj, dept, _ in SAMPLE_PROJECTS:
-        dept_employees = employees[dept]
-        for i, ym in enumerate(months):
-            # Some months active, others idle
-            if rng.random() < 0.45:
-                mm = [2, 3, 6, 8, 3, 1][i % 6]  # repeatable pattern
-                phase = ["Design", "Planning", "Development", "Testing", "Delivery", "Planning"][i % 6]
-                
-                # Assign employees based on MM
-                num_employees = min(len(dept_employees), max(1, mm // 2))
-                assigned = rng.choice(dept_employees, size=num_employees, replace=False)
-                
-                # Distribute MM among employees
-                allocation_per_person = mm / num_employees
-                employee_list = ", ".join([f"{emp} ({allocation_per_person:.1f})" for emp in sorted(assigned)])
-                
-                rows.append([proj, ym, phase, mm, employee_list])
-            else:
-                # explicit Idle rows are not required; missing = idle
-                pass
-    alloc = pd.DataFrame(rows, columns=["Project", "Date", "Phase", "MM", "Employees"])
+    # Some months active, others idle (explicit Idle rows are not required; missing = idle)
+    active = rng.random((len(SAMPLE_PROJECTS), len(months))) < 0.45
+    proj_idx, month_idx = np.nonzero(active)
+    mm = np.array([2, 3, 6, 8, 3, 1])[month_idx % 6]  # repeatable pattern
+    phase = np.array(["Design", "Planning", "Development", "Testing", "Delivery", "Planning"])[month_idx % 6]
+    depts = meta["Department"].to_numpy()[proj_idx]
+
+    # Assign employees based on MM: one batched shuffle of pool positions for all rows
+    emp_arrays = {d: np.array(v) for d, v in employees.items()}
+    pool_size = min(len(v) for v in employees.values())
+    num_employees = np.clip(mm // 2, 1, pool_size)
+    picks = rng.permuted(np.tile(np.arange(pool_size), (len(mm), 1)), axis=1)
+
+    # Distribute MM among employees
+    allocation_per_person = mm / num_employees
+    employee_lists = [
+        ", ".join([f"{emp} ({per:.1f})" for emp in sorted(emp_arrays[dept][row[:k]])])
+        for dept, row, k, per in zip(depts, picks, num_employees.tolist(), allocation_per_person.tolist())
+    ]
+
+    alloc = pd.DataFrame({
+        "Project": meta["Project"].to_numpy()[proj_idx],
+        "Date": months[month_idx],
+        "Phase": phase,
+        "MM": mm,
+        "Employees": employee_lists,
+    })
     return meta, alloc
 
 
@@ -452,70 +675,339 @@ def ensure_columns(df: pd.DataFrame, required: List[str], name: str):
         raise ValueError(f"{name} is missing required columns: {', '.join(missing)}")
 
 
-def month_mm_phase_employees(df_alloc: pd.DataFrame, project: str, ym: str) -> Tuple[float, str | None, str]:
+def meta_options(df_meta: pd.DataFrame) -> Tuple[List[str], List[str]]:
+    """Sorted project and department lists, cached in session state per meta content."""
+    key = hashlib.md5(pd.util.hash_pandas_object(df_meta, index=False).to_numpy().tobytes()).hexdigest()
+    cached = st.session_state.get("meta_options")
+    if cached is None or cached[0] != key:
+        projects = sorted(df_meta["Project"].unique().tolist())
+        departments = sorted(df_meta["Department"].unique().tolist())
+        cached = (key, projects, departments)
+        st.session_state.meta_options = cached
+    return cached[1], cached[2]
+
+
+def kpi_html(total: int, active: int, low: int) -> str:
+    return """
+<div style='display:flex;gap:12px;align-items:center;margin:16px 0;flex-wrap:wrap;'>
+  <div style='padding:10px 20px;border-radius:8px;font-weight:600;border:2px solid #667eea;background:#f5f7ff;color:#667eea;display:flex;align-items:center;gap:10px;'>
+    <div style='font-size:28px;font-weight:700;'>{}</div>
+    <div style='font-size:13px;opacity:0.85;font-weight:600;'>Total Projects</div>
+  </div>
+  <div style='padding:10px 20px;border-radius:8px;font-weight:600;border:2px solid #f43f5e;background:#fef2f2;color:#f43f5e;display:flex;align-items:center;gap:10px;'>
+    <div style='font-size:28px;font-weight:700;'>{}</div>
+    <div style='font-size:13px;opacity:0.85;font-weight:600;'>Active This Month</div>
+  </div>
+  <div style='padding:10px 20px;border-radius:8px;font-weight:600;border:2px solid #10b981;background:#f0fdf4;color:#10b981;display:flex;align-items:center;gap:10px;'>
+    <div style='font-size:28px;font-weight:700;'>{}</div>
+    <div style='font-size:13px;opacity:0.85;font-weight:600;'>Low Activity</div>
+  </div>
+</div>
+""".format(total, active, low)
+
+
+_YM_RE = re.compile(r"\d{4}-\d{2}")
+
+
+def to_month(ym: str) -> np.datetime64:
+    """Parse "YYYY-MM" to datetime64[M]; NaT if malformed."""
+    # strict: datetime64 alone would read "2025" or "2025-03-15" as a month
+    if not isinstance(ym, str) or not _YM_RE.fullmatch(ym):
+        return np.datetime64("NaT", "M")
+    try:
+        return np.datetime64(ym, "M")
+    except ValueError:  # e.g. month 13
+        return np.datetime64("NaT", "M")
+
+
+def add_month_column(df_alloc: pd.DataFrame) -> pd.DataFrame:
+    """Attach `_DateM`, the Date column parsed once for vectorized month compares."""
+    months = pd.to_datetime(df_alloc["Date"], format="%Y-%m", errors="coerce")
+    return df_alloc.assign(_DateM=months.to_numpy().astype("datetime64[M]"))
+
+
+def phase_categorical(phase: pd.Series) -> pd.Categorical:
+    """Phase as a categorical over PHASES, keeping any other labels present (e.g. Idle)."""
+    extra = [p for p in pd.unique(phase.dropna()) if p not in PHASES]
+    return pd.Categorical(phase, categories=PHASES + extra)
+
+
+def prepare_alloc(df_alloc: pd.DataFrame) -> pd.DataFrame:
+    """Normalize allocation dtypes after load or save."""
+    return add_month_column(df_alloc.assign(Phase=phase_categorical(df_alloc["Phase"])))
+
+
+def shift_months(df_alloc: pd.DataFrame, edited: pd.DataFrame, months: int) -> pd.DataFrame:
+    """Move allocations matching the edited rows' (Project, Date, Phase) by `months`."""
+    keys = ["Project", "Date", "Phase"]
+    old = add_month_column(edited)["_DateM"]  # re-parsed: Date may have been edited in place
+    edits = edited.loc[old.notna(), keys].copy()  # rows with unparseable dates are skipped
+    new = old.dropna().to_numpy().astype("datetime64[M]") + np.timedelta64(months, "M")
+    edits["NewDate"] = np.datetime_as_string(new)
+    out = df_alloc.merge(edits.drop_duplicates(keys), on=keys, how="left")
+    out["Date"] = out["NewDate"].fillna(out["Date"])
+    return add_month_column(out.drop(columns="NewDate"))
+
+
+def employee_tokens(df_alloc: pd.DataFrame) -> pd.DataFrame:
+    """One row per "Name (mm)" token of Employees, with its Project and Date."""
+    # object first: an all-blank CSV column reads as null[pyarrow], which cannot hold ""
+    tokens = df_alloc["Employees"].astype(object).fillna("").astype(str).str.extractall(EMP_RE.pattern)
+    tokens.columns = ["name", "mm"]
+    tokens = tokens.droplevel("match")
+    tokens = tokens.assign(name=tokens["name"].str.strip(), mm=tokens["mm"].astype(float))
+    return tokens.join(df_alloc[["Project", "Date"]])
+
+
+def month_index(df_alloc: pd.DataFrame) -> pd.DataFrame:
+    """Aggregate allocations once so project-month lookups are O(1)."""
+    # sum by phase; keep the phase with max MM per project-month
+    keys = ["Project", "Date", "Phase"]
+    agg = df_alloc.groupby(keys, sort=False, observed=True, as_index=False)["MM"].sum()
+    idx = agg.groupby(["Project", "Date"], sort=False)["MM"].idxmax()
+    # first non-null Employees per group, as the old agg({"Employees": "first"})
+    first_emp = df_alloc.groupby(keys, sort=False, observed=True, as_index=False)["Employees"].first()
+    top = agg.loc[idx].merge(first_emp, on=keys, how="left")
+    return top.set_index(["Project", "Date"])[["MM", "Phase", "Employees"]]
+
+
+def month_lookup(top: pd.DataFrame) -> Dict[Tuple[str, str], Tuple[float, str, str]]:
+    """Plain-dict view of month_index, for hashing per cell instead of .loc."""
+    return {
+        key: (float(mm), str(phase), "" if pd.isna(employees) else str(employees))
+        for key, (mm, phase, employees) in zip(top.index, top.itertuples(index=False, name=None))
+    }
+
+
+def month_mm_phase_employees(lookup: Dict[Tuple[str, str], Tuple[float, str, str]], project: str, ym: str) -> Tuple[float, str | None, str]:
     """Get MM, phase, and employees for a project-month."""
-    rows = df_alloc[(df_alloc["Project"] == project) & (df_alloc["Date"] == ym)]
-    if rows.empty:
-        return 0.0, None, ""
-    # sum by phase; take the phase with max MM
-    grp = rows.groupby("Phase").agg({"MM": "sum", "Employees": "first"}).sort_values("MM", ascending=False)
-    phase = grp.index[0]
-    mm = float(grp["MM"].iloc[0])
-    employees = str(grp["Employees"].iloc[0]) if "Employees" in grp.columns else ""
-    return mm, phase, employees
+    return lookup.get((project, ym), (0.0, None, ""))  # missing => Idle
 
 
 def phase_badge(phase: str) -> str:
-    pm = phase.lower()
-    if pm == "planning":
-        cls = "plan"; txt = "Planning"
-    elif pm == "design":
-        cls = "design"; txt = "Design"
-    elif pm == "development":
-        cls = "dev"; txt = "Development"
-    elif pm == "testing":
-        cls = "test"; txt = "Testing"
-    elif pm == "delivery":
-        cls = "deliv"; txt = "Delivery"
-    else:
-        return ""  # Idle => no badge
-    return f"<span class='badge {cls}'>{txt}</span>"
+    return _BADGE_HTML.get(phase.lower(), "")  # Idle => no badge
 
 
-def month_phase(df_alloc: pd.DataFrame, project: str, ym: str) -> str | None:
-    rows = df_alloc[(df_alloc["Project"] == project) & (df_alloc["Date"] == ym)]
-    if rows.empty:
-        return None  # Idle
-    # If multiple, pick the one with biggest MM
-    top = rows.sort_values("MM", ascending=False).iloc[0]
-    return str(top["Phase"])
+def cell_html(phase: str | None) -> str:
+    """Heat map cell for a phase; unknown or missing phases render as Idle."""
+    return _IDLE_HTML if not phase else _PHASE_CELL.get(phase.lower(), _IDLE_HTML)
 
 
-def month_mm_and_phase(df_alloc: pd.DataFrame, project: str, ym: str) -> Tuple[float, str | None]:
-    rows = df_alloc[(df_alloc["Project"] == project) & (df_alloc["Date"] == ym)]
-    if rows.empty:
-        return 0.0, None
-    # sum by phase; take the phase with max MM
-    grp = rows.groupby("Phase")["MM"].sum().sort_values(ascending=False)
-    phase = grp.index[0]
-    mm = float(grp.iloc[0])
-    return mm, phase
+# department -> badge HTML
+_DEPT_MAP = {
+    "SCI & ENG": "<span class='dept-badge'>SCI & ENG</span>",
+    "DIGITAL": "<span class='dept-badge' style='color:#1d4ed8;background:#dbeafe;border-color:#bfdbfe;'>DIGITAL</span>",
+    "PMO": "<span class='dept-badge' style='color:#6b21a8;background:#f3e8ff;border-color:#e9d5ff;'>PMO</span>",
+}
 
 
+@functools.lru_cache(maxsize=16)
 def dept_badge(dept: str) -> str:
-    # style by department
-    if dept.upper().startswith("SCI"):
-        return "<span class='dept-badge'>SCI & ENG</span>"
-    if "DIGITAL" in dept.upper():
-        return "<span class='dept-badge' style='color:#1d4ed8;background:#dbeafe;border-color:#bfdbfe;'>DIGITAL</span>"
-    return "<span class='dept-badge' style='color:#6b21a8;background:#f3e8ff;border-color:#e9d5ff;'>PMO</span>"
+    # style by department; classified once per distinct value within a run
+    # (Streamlit re-executes the script on rerun, which starts a fresh cache)
+    key = dept.upper()
+    if key.startswith("SCI"):
+        return _DEPT_MAP["SCI & ENG"]
+    if "DIGITAL" in key:
+        return _DEPT_MAP["DIGITAL"]
+    return _DEPT_MAP["PMO"]
+
+
+# -------------------------------
+# Charts
+# -------------------------------
+def _pie_template():
+    colors = ['#667eea', '#3b82f6', '#10b981']
+    fig = go.Figure(data=[go.Pie(
+        hole=0.5,
+        marker=dict(colors=colors),
+        textinfo='label+percent',
+        textfont=dict(size=12, color='white'),
+        hovertemplate='<b>%{label}</b><br>%{value} MM<br>%{percent}<extra></extra>'
+    )])
+    
+    fig.update_layout(
+        showlegend=True,
+        height=250,
+        margin=dict(l=0, r=0, t=0, b=0),
+        legend=dict(
+            orientation="v",
+            yanchor="middle",
+            y=0.5,
+            xanchor="left",
+            x=1.1
+        )
+    )
+    return fig
+
+
+def _trend_template():
+    fig = go.Figure()
+    
+    fig.add_trace(go.Scatter(
+        mode='lines+markers',
+        line=dict(color='#667eea', width=3),
+        marker=dict(size=8, color='#667eea'),
+        fill='tonexty',
+        fillcolor='rgba(102, 126, 234, 0.1)',
+        hovertemplate='<b>Month %{x}</b><br>%{y:.0f} MM<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        height=250,
+        margin=dict(l=0, r=0, t=0, b=0),
+        xaxis=dict(title='', showgrid=True, gridcolor='#f1f5f9'),
+        yaxis=dict(title='', showgrid=True, gridcolor='#f1f5f9'),
+        plot_bgcolor='white',
+        hovermode='x unified'
+    )
+    return fig
+
+
+_CHART_TEMPLATES = {"pie": _pie_template, "trend": _trend_template}
+
+
+def chart_template(name: str):
+    """Figure built once per session; callers only swap the trace data."""
+    key = f"chart_{name}"
+    if key not in st.session_state:
+        st.session_state[key] = _CHART_TEMPLATES[name]()
+    return st.session_state[key]
+
+
+# -------------------------------
+# Dashboard metrics (cached across reruns)
+# -------------------------------
+@st.cache_data(show_spinner=False)
+def _employee_allocations(df_alloc: pd.DataFrame) -> Tuple[Dict[Tuple[str, str], dict], List[dict], List[str]]:
+    """Per-employee workload for the dashboard, cached by the allocation frame.
+
+    Returns (allocations, conflicts, employees): allocations maps
+    (employee, month) -> {'total_mm', 'projects': [(project, mm), ...]},
+    conflicts lists the over-allocated entries, employees is sorted.
+    """
+    tokens = employee_tokens(df_alloc)
+    by_key = tokens.assign(pm=list(zip(tokens['Project'], tokens['mm']))).groupby(['name', 'Date'], sort=False)
+    totals = by_key['mm'].sum()
+    projects = by_key['pm'].agg(list)
+    emp_alloc = {
+        key: {'total_mm': total, 'projects': projs}
+        for key, total, projs in zip(totals.index, totals.tolist(), projects.tolist())
+    }
+
+    # Conflicts: >100% = 4.0 MM per month assuming 4 weeks
+    over = totals > 4.0
+    conflicts = [
+        {
+            'employee': emp,
+            'month': date,
+            'total_mm': total,
+            'percent': (total / 4.0) * 100,
+            'projects': projs
+        }
+        for (emp, date), total, projs in zip(totals.index[over], totals[over].tolist(), projects[over].tolist())
+    ]
+    return emp_alloc, conflicts, sorted(totals.index.unique(level='name'))
+
+
+@st.cache_data(show_spinner=False)
+def _monthly_sum(df_alloc: pd.DataFrame) -> pd.Series:
+    """Total MM per "YYYY-MM" Date, in one groupby pass."""
+    return df_alloc.groupby('Date', sort=False)['MM'].sum()
+
+
+# Plain helpers over the cached sum: caching them too would hash their inputs again
+def _monthly_totals(monthly_sum: pd.Series, months: Tuple[str, ...]) -> List[float]:
+    return [float(monthly_sum.get(month, 0.0)) for month in months]
+
+
+def _capacity(monthly_totals: List[float], months: Tuple[str, ...]) -> List[dict]:
+    return [
+        {'month': month, 'total_mm': total, 'available': 40}
+        for month, total in zip(months, monthly_totals)
+    ]
+
+
+# -------------------------------
+# Data loading (cached across reruns)
+# -------------------------------
+GSHEETS_SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive"
+]
+
+
+@st.cache_resource(show_spinner=False)
+def _gspread_client(creds_items: Tuple[Tuple[str, str], ...]):
+    """Authorized gspread client, shared across reruns per service account."""
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    creds = Credentials.from_service_account_info(dict(creds_items), scopes=GSHEETS_SCOPES)
+    return gspread.authorize(creds)
+
+
+def open_spreadsheet(spreadsheet_url: str):
+    """Open the spreadsheet with the service account from secrets."""
+    creds_dict = dict(st.secrets["gsheet"])
+    creds_dict.pop("spreadsheet_url", None)
+    return _gspread_client(tuple(sorted(creds_dict.items()))).open_by_url(spreadsheet_url)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_worksheet(spreadsheet_url: str, worksheet_name: str) -> pd.DataFrame:
+    records = open_spreadsheet(spreadsheet_url).worksheet(worksheet_name).get_all_records()
+    return pd.DataFrame(records)
+
+
+def _load_gsheets(spreadsheet_url: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    return _load_worksheet(spreadsheet_url, "Meta"), _load_worksheet(spreadsheet_url, "Allocations")
+
+
+@st.cache_data(show_spinner=False)
+def _load_csv(file_bytes: bytes) -> pd.DataFrame:
+    try:
+        # Arrow reader and Arrow-backed columns (pyarrow ships with streamlit)
+        return pd.read_csv(io.BytesIO(file_bytes), engine="pyarrow", dtype_backend="pyarrow")
+    except (ImportError, ValueError):
+        return pd.read_csv(io.BytesIO(file_bytes))
+
+
+@st.cache_data(show_spinner=False)
+def _sample(start_ym: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    return sample_frames(start_ym)
+
+
+def load_data_sources(use_gsheets, meta_file, alloc_file, start_ym):
+    """Load data from Google Sheets or CSV files."""
+    if use_gsheets and GSHEETS_AVAILABLE:
+        try:
+            spreadsheet_url = st.secrets["gsheet"]["spreadsheet_url"]
+            meta, alloc = _load_gsheets(spreadsheet_url)
+            st.sidebar.success("Connected to Google Sheets!")
+            return meta, alloc, spreadsheet_url
+        except Exception as e:
+            st.sidebar.error(f"Google Sheets connection failed: {e}")
+            st.sidebar.info("Falling back to CSV/sample data...")
+    
+    # Fallback to CSV or sample data
+    if meta_file:
+        meta = _load_csv(meta_file.getvalue())
+    else:
+        meta, _ = _sample(start_ym)
+    
+    if alloc_file:
+        alloc = _load_csv(alloc_file.getvalue())
+    else:
+        _, alloc = _sample(start_ym)
+    
+    return meta, alloc, None
 
 
 # -------------------------------
 # App
 # -------------------------------
 st.set_page_config(page_title="HE Workload Visualizer", layout="wide")
-st.markdown(CSS, unsafe_allow_html=True)
 
 # Sidebar - ALL controls go here
 with st.sidebar:
@@ -528,6 +1020,7 @@ with st.sidebar:
         st.session_state.use_gsheets = use_gsheets_input
         
         if st.button("🔄 Reload from Sheets", use_container_width=True):
+            _load_worksheet.clear()
             if "alloc_data" in st.session_state:
                 del st.session_state.alloc_data
             if "meta_data" in st.session_state:
@@ -577,57 +1070,6 @@ with st.sidebar:
     if st.button("✏️ Edit Allocations", use_container_width=True, type="primary", key="edit_alloc_btn"):
         st.session_state.show_editor = not st.session_state.get("show_editor", False)
 
-# Data loading function
-def load_data_sources(use_gsheets, meta_file, alloc_file, start_ym):
-    """Load data from Google Sheets or CSV files."""
-    if use_gsheets and GSHEETS_AVAILABLE:
-        try:
-            # Get credentials from Streamlit secrets
-            creds_dict = dict(st.secrets["gsheet"])
-            spreadsheet_url = creds_dict.pop("spreadsheet_url")
-            
-            # Create credentials object
-            scopes = [
-                "https://www.googleapis.com/auth/spreadsheets",
-                "https://www.googleapis.com/auth/drive"
-            ]
-            creds = Credentials.from_service_account_info(creds_dict, scopes=scopes)
-            client = gspread.authorize(creds)
-            
-            # Open spreadsheet and worksheets
-            sheet = client.open_by_url(spreadsheet_url)
-            
-            # Read Meta worksheet
-            meta_worksheet = sheet.worksheet("Meta")
-            meta_data = meta_worksheet.get_all_records()
-            meta = pd.DataFrame(meta_data)
-            
-            # Read Allocations worksheet
-            alloc_worksheet = sheet.worksheet("Allocations")
-            alloc_data = alloc_worksheet.get_all_records()
-            alloc = pd.DataFrame(alloc_data)
-            
-            st.sidebar.success("Connected to Google Sheets!")
-            return meta, alloc, (client, sheet, meta_worksheet, alloc_worksheet)
-        except Exception as e:
-            st.sidebar.error(f"Google Sheets connection failed: {e}")
-            st.sidebar.info("Falling back to CSV/sample data...")
-            use_gsheets = False
-    
-    # Fallback to CSV or sample data
-    if meta_file:
-        meta = pd.read_csv(meta_file)
-    else:
-        meta, _ = sample_frames(start_ym)
-    
-    if alloc_file:
-        alloc = pd.read_csv(alloc_file)
-    else:
-        _, alloc = sample_frames(start_ym)
-    
-    return meta, alloc, None
-
-
 # Data - load early before any UI elements
 try:
     # Get settings from sidebar (they're defined there now)
@@ -636,7 +1078,7 @@ try:
     alloc_file = st.session_state.get('alloc_file', None)
     start_ym = st.session_state.get('start_ym', '2025-01')
     
-    meta, alloc, gsheets_conn = load_data_sources(use_gsheets, meta_file, alloc_file, start_ym)
+    meta, alloc, gsheets_url = load_data_sources(use_gsheets, meta_file, alloc_file, start_ym)
     
     ensure_columns(meta, ["Project", "Department", "Total_MM"], "Meta dataframe")
     
@@ -645,6 +1087,8 @@ try:
         alloc["Employees"] = ""
     
     ensure_columns(alloc, ["Project", "Date", "Phase", "MM"], "Allocations dataframe")
+    # Date stays a string for display; filters compare the parsed month
+    alloc = prepare_alloc(alloc)
 except Exception as e:
     st.error(f"Data error: {e}")
     st.stop()
@@ -654,11 +1098,10 @@ if "alloc_data" not in st.session_state:
     st.session_state.alloc_data = alloc.copy()
 if "meta_data" not in st.session_state:
     st.session_state.meta_data = meta.copy()
-if "gsheets_conn" not in st.session_state:
-    st.session_state.gsheets_conn = gsheets_conn
+# Spreadsheet URL of the active Google Sheets source (None for CSV/sample data)
+st.session_state.gsheets_url = gsheets_url
 
-# Update connection in session state
-st.session_state.gsheets_conn = gsheets_conn
+project_options, department_options = meta_options(st.session_state.meta_data)
 
 # Edit Data Section - only if edit button was clicked
 if st.session_state.get("show_editor", False):
@@ -671,26 +1114,26 @@ if st.session_state.get("show_editor", False):
         with col1:
             filter_project = st.selectbox(
                 "Filter by Project", 
-                ["All"] + sorted(st.session_state.meta_data["Project"].unique().tolist()),
+                ["All"] + project_options,
                 key="edit_filter_proj"
             )
         with col2:
             filter_phase = st.selectbox(
                 "Filter by Phase",
-                ["All", "Planning", "Design", "Development", "Testing", "Delivery"],
+                ["All"] + PHASES,
                 key="edit_filter_phase"
             )
         with col3:
             filter_date = st.text_input("Filter by Date (YYYY-MM)", key="edit_filter_date")
     
     # Apply filters
-    filtered_alloc = st.session_state.alloc_data.copy()
+    filtered_alloc = st.session_state.alloc_data
     if filter_project != "All":
         filtered_alloc = filtered_alloc[filtered_alloc["Project"] == filter_project]
     if filter_phase != "All":
         filtered_alloc = filtered_alloc[filtered_alloc["Phase"] == filter_phase]
     if filter_date:
-        filtered_alloc = filtered_alloc[filtered_alloc["Date"] == filter_date]
+        filtered_alloc = filtered_alloc[filtered_alloc["_DateM"] == to_month(filter_date)]
     
     # Editable dataframe
     edited_alloc = st.data_editor(
@@ -700,7 +1143,7 @@ if st.session_state.get("show_editor", False):
         column_config={
             "Project": st.column_config.SelectboxColumn(
                 "Project",
-                options=st.session_state.meta_data["Project"].tolist(),
+                options=project_options,
                 required=True
             ),
             "Date": st.column_config.TextColumn(
@@ -710,7 +1153,7 @@ if st.session_state.get("show_editor", False):
             ),
             "Phase": st.column_config.SelectboxColumn(
                 "Phase",
-                options=["Planning", "Design", "Development", "Testing", "Delivery"],
+                options=PHASES,
                 required=True
             ),
             "MM": st.column_config.NumberColumn(
@@ -724,7 +1167,8 @@ if st.session_state.get("show_editor", False):
                 "Employees (Name (MM), ...)",
                 help="Format: Alex Morgan (2.0), Sofia Rodriguez (1.5)",
                 required=False
-            )
+            ),
+            "_DateM": None,  # derived from Date; hidden
         },
         key="alloc_editor"
     )
@@ -738,28 +1182,39 @@ if st.session_state.get("show_editor", False):
             # Update the filtered rows in the main dataset
             if filter_project != "All" or filter_phase != "All" or filter_date:
                 # Merge edited data back
-                mask = pd.Series([True] * len(st.session_state.alloc_data))
+                alloc_data = st.session_state.alloc_data
+                mask = pd.Series(True, index=alloc_data.index)
                 if filter_project != "All":
-                    mask &= st.session_state.alloc_data["Project"] == filter_project
+                    mask &= alloc_data["Project"] == filter_project
                 if filter_phase != "All":
-                    mask &= st.session_state.alloc_data["Phase"] == filter_phase
+                    mask &= alloc_data["Phase"] == filter_phase
                 if filter_date:
-                    mask &= st.session_state.alloc_data["Date"] == filter_date
-                st.session_state.alloc_data = st.session_state.alloc_data[~mask]
-                st.session_state.alloc_data = pd.concat([st.session_state.alloc_data, edited_alloc], ignore_index=True)
+                    mask &= alloc_data["_DateM"] == to_month(filter_date)
+                shown = alloc_data.index[mask]
+                kept = edited_alloc.index.intersection(shown)
+                # Rows deleted in the editor are dropped; edited rows are written in place
+                alloc_data = alloc_data.drop(shown.difference(kept))
+                alloc_data.loc[kept, edited_alloc.columns] = edited_alloc.loc[kept]
+                added = edited_alloc.loc[edited_alloc.index.difference(kept)]
+                if len(added) > 0:
+                    alloc_data = pd.concat([alloc_data, added], ignore_index=True)
+                st.session_state.alloc_data = alloc_data
             else:
                 st.session_state.alloc_data = edited_alloc.copy()
+            st.session_state.alloc_data = prepare_alloc(st.session_state.alloc_data)
             
             # Save to Google Sheets if enabled
-            if use_gsheets and st.session_state.gsheets_conn is not None:
+            if use_gsheets and st.session_state.gsheets_url is not None:
                 try:
-                    client, sheet, meta_worksheet, alloc_worksheet = st.session_state.gsheets_conn
+                    alloc_worksheet = open_spreadsheet(st.session_state.gsheets_url).worksheet("Allocations")
                     
                     # Clear and update allocations worksheet
                     alloc_worksheet.clear()
-                    alloc_worksheet.update([st.session_state.alloc_data.columns.values.tolist()] + 
-                                          st.session_state.alloc_data.values.tolist())
+                    sheet_data = st.session_state.alloc_data.drop(columns="_DateM")
+                    alloc_worksheet.update([sheet_data.columns.values.tolist()] + 
+                                          sheet_data.values.tolist())
                     
+                    _load_worksheet.clear()
                     st.success("Changes saved to Google Sheets!")
                 except Exception as e:
                     st.error(f"Failed to save to Google Sheets: {e}")
@@ -771,52 +1226,20 @@ if st.session_state.get("show_editor", False):
     with action_col2:
         if st.button("⏩ Shift Selected +1 Month"):
             if len(edited_alloc) > 0:
-                for idx in edited_alloc.index:
-                    old_date = edited_alloc.loc[idx, "Date"]
-                    try:
-                        y, m = map(int, old_date.split("-"))
-                        new_m = m + 1
-                        new_y = y
-                        if new_m > 12:
-                            new_m = 1
-                            new_y += 1
-                        new_date = f"{new_y:04d}-{new_m:02d}"
-                        # Update in main data
-                        mask = (st.session_state.alloc_data["Project"] == edited_alloc.loc[idx, "Project"]) & \
-                               (st.session_state.alloc_data["Date"] == old_date) & \
-                               (st.session_state.alloc_data["Phase"] == edited_alloc.loc[idx, "Phase"])
-                        st.session_state.alloc_data.loc[mask, "Date"] = new_date
-                    except:
-                        pass
+                st.session_state.alloc_data = shift_months(st.session_state.alloc_data, edited_alloc, 1)
                 st.success("✅ Shifted forward 1 month!")
                 st.rerun()
     
     with action_col3:
         if st.button("⏪ Shift Selected -1 Month"):
             if len(edited_alloc) > 0:
-                for idx in edited_alloc.index:
-                    old_date = edited_alloc.loc[idx, "Date"]
-                    try:
-                        y, m = map(int, old_date.split("-"))
-                        new_m = m - 1
-                        new_y = y
-                        if new_m < 1:
-                            new_m = 12
-                            new_y -= 1
-                        new_date = f"{new_y:04d}-{new_m:02d}"
-                        # Update in main data
-                        mask = (st.session_state.alloc_data["Project"] == edited_alloc.loc[idx, "Project"]) & \
-                               (st.session_state.alloc_data["Date"] == old_date) & \
-                               (st.session_state.alloc_data["Phase"] == edited_alloc.loc[idx, "Phase"])
-                        st.session_state.alloc_data.loc[mask, "Date"] = new_date
-                    except:
-                        pass
+                st.session_state.alloc_data = shift_months(st.session_state.alloc_data, edited_alloc, -1)
                 st.success("✅ Shifted back 1 month!")
                 st.rerun()
     
     with action_col4:
         if st.button("📥 Download as CSV"):
-            csv = st.session_state.alloc_data.to_csv(index=False)
+            csv = st.session_state.alloc_data.drop(columns="_DateM").to_csv(index=False)
             st.download_button(
                 label="Download CSV",
                 data=csv,
@@ -825,45 +1248,39 @@ if st.session_state.get("show_editor", False):
             )
 
 # Use session state data for visualizations
-alloc = st.session_state.alloc_data.copy()
-meta = st.session_state.meta_data.copy()
+alloc = st.session_state.alloc_data
+meta = st.session_state.meta_data
+
+# Per-render lookup tables for the heat map and timeline cells
+phase_top = month_index(alloc)
+phase_lookup = month_lookup(phase_top)
 
 # MAIN CONTENT AREA STARTS HERE - Department filter only
 st.markdown("### Department Filter")
-dept_opts = ["All"] + sorted(meta["Department"].unique().tolist())
+dept_opts = ["All"] + department_options
 dept = st.selectbox("Select Department", dept_opts, index=0, label_visibility="collapsed")
 if dept != "All":
-    meta_view = meta[meta["Department"] == dept].copy()
+    meta_view = meta[meta["Department"] == dept]
 else:
-    meta_view = meta.copy()
+    meta_view = meta
+# Sorted once; both timeline tabs iterate it
+projects_sorted = meta_view.sort_values("Project")[["Project", "Department"]]
 
 # KPIs
 active_month = focus_month
 # active this month: projects with any allocation in focus month
-active = alloc[(alloc["Date"] == active_month) & (alloc["Project"].isin(meta_view["Project"]))]
+alloc_by_date = alloc.groupby("Date", sort=False)
+try:
+    active = alloc_by_date.get_group(active_month)
+except KeyError:
+    active = alloc.iloc[:0]
+active = active[active["Project"].isin(frozenset(meta_view["Project"]))]
 active_count = active["Project"].nunique()
 total_projects = meta_view["Project"].nunique()
 low_activity = total_projects - active_count
 
-st.markdown(
-    """
-<div style='display:flex;gap:12px;align-items:center;margin:16px 0;flex-wrap:wrap;'>
-  <div style='padding:10px 20px;border-radius:8px;font-weight:600;border:2px solid #667eea;background:#f5f7ff;color:#667eea;display:flex;align-items:center;gap:10px;'>
-    <div style='font-size:28px;font-weight:700;'>{}</div>
-    <div style='font-size:13px;opacity:0.85;font-weight:600;'>Total Projects</div>
-  </div>
-  <div style='padding:10px 20px;border-radius:8px;font-weight:600;border:2px solid #f43f5e;background:#fef2f2;color:#f43f5e;display:flex;align-items:center;gap:10px;'>
-    <div style='font-size:28px;font-weight:700;'>{}</div>
-    <div style='font-size:13px;opacity:0.85;font-weight:600;'>Active This Month</div>
-  </div>
-  <div style='padding:10px 20px;border-radius:8px;font-weight:600;border:2px solid #10b981;background:#f0fdf4;color:#10b981;display:flex;align-items:center;gap:10px;'>
-    <div style='font-size:28px;font-weight:700;'>{}</div>
-    <div style='font-size:13px;opacity:0.85;font-weight:600;'>Low Activity</div>
-  </div>
-</div>
-""".format(total_projects, active_count, low_activity),
-    unsafe_allow_html=True,
-) 
+# Page + dashboard CSS and KPI strip go out in a single markdown element
+st.markdown(CSS + DASH_CSS + kpi_html(total_projects, active_count, low_activity), unsafe_allow_html=True)
 
 tab1, tab2, tab3 = st.tabs(["3-Month Heat Map (Blocks)", "Yearly Timeline (Bars)", "Dashboard"])
 
@@ -871,311 +1288,121 @@ tab1, tab2, tab3 = st.tabs(["3-Month Heat Map (Blocks)", "Yearly Timeline (Bars)
 # 3-Month Heat Map
 # -------------------------------
 with tab1:
-    st.markdown("<div class='container-card'>", unsafe_allow_html=True)
-    st.markdown("<div class='note'>Focus: {} → Then: {} and {} – Idle cells are intentionally blank.</div>".format(
-        focus_month,
-        yms(focus_month, 2)[1],  # next month label
-        yms(focus_month, 3)[2]   # month +2
-    ), unsafe_allow_html=True)
-
-    curr, nxt, nxt2 = yms(focus_month, 3)[0], yms(focus_month, 3)[1], yms(focus_month, 3)[2]
-
-    # Build complete HTML for the grid
-    html_parts = ["<div class='grid'>"]
-    html_parts.append("<div class='head'>Project</div>")
-    html_parts.append("<div class='head'>Current Month</div>")
-    html_parts.append("<div class='head'>Next Month</div>")
-    html_parts.append("<div class='head'>Month +2</div>")
-
-    for _, row in meta_view.sort_values("Project").iterrows():
-        proj = row["Project"]
-        dept_html = dept_badge(row["Department"])
+    curr, nxt, nxt2 = yms(focus_month, 3)
+
+    # Build complete HTML for the card: note + grid
+    buf = io.StringIO()
+    buf.write("<div class='container-card'>")
+    buf.write("<div class='note'>Focus: {} → Then: {} and {} – Idle cells are intentionally blank.</div>".format(
+        curr, nxt, nxt2
+    ))
+    buf.write("<div class='grid'>")
+    buf.write("<div class='head'>Project</div>")
+    buf.write("<div class='head'>Current Month</div>")
+    buf.write("<div class='head'>Next Month</div>")
+    buf.write("<div class='head'>Month +2</div>")
+
+    for proj, dept_name in projects_sorted.itertuples(index=False, name=None):
+        dept_html = dept_badge(dept_name)
 
         # Determine phases
-        ph1 = month_phase(alloc, proj, curr)
-        ph2 = month_phase(alloc, proj, nxt)
-        ph3 = month_phase(alloc, proj, nxt2)
-
-        # Build cells with phase styling
-        def cell_html(phase: str | None) -> str:
-            if not phase or phase.lower() == "idle":
-                return "<div class='cell idle'>Idle</div>"
-            
-            phase_lower = phase.lower()
-            if phase_lower == "planning":
-                return "<div class='cell plan'>Planning</div>"
-            elif phase_lower == "design":
-                return "<div class='cell design'>Design</div>"
-            elif phase_lower == "development":
-                return "<div class='cell dev'>Development</div>"
-            elif phase_lower == "testing":
-                return "<div class='cell test'>Testing</div>"
-            elif phase_lower == "delivery":
-                return "<div class='cell deliv'>Delivery</div>"
-            else:
-                return "<div class='cell idle'>Idle</div>"
+        _, ph1, _ = month_mm_phase_employees(phase_lookup, proj, curr)
+        _, ph2, _ = month_mm_phase_employees(phase_lookup, proj, nxt)
+        _, ph3, _ = month_mm_phase_employees(phase_lookup, proj, nxt2)
 
-        html_parts.append(
+        # One write per project row
+        buf.write(
             f"<div class='project-name'><span>{proj}</span>{dept_html}</div>"
+            + cell_html(ph1) + cell_html(ph2) + cell_html(ph3)
         )
-        html_parts.append(cell_html(ph1))
-        html_parts.append(cell_html(ph2))
-        html_parts.append(cell_html(ph3))
 
-    html_parts.append("</div>")  # close grid
-    
-    # Render the complete grid at once
-    st.markdown("".join(html_parts), unsafe_allow_html=True)
+    buf.write("</div>")  # close grid
+    buf.write("</div>")  # close container-card
     
-    st.markdown("</div>", unsafe_allow_html=True)  # close container-card
+    # Render the complete card at once
+    st.markdown(buf.getvalue(), unsafe_allow_html=True)
 
 # -------------------------------
 # Yearly Timeline (Enhanced)
 # -------------------------------
 with tab2:
-    st.markdown("<div class='container-card'>", unsafe_allow_html=True)
-
     months = yms(start_ym, months_to_display)
 
-    # Build complete HTML for the entire grid
-    html_parts = ["<div class='year-grid'>"]
+    # Build complete HTML for the card and the entire grid
+    buf = io.StringIO()
+    buf.write("<div class='container-card'>")
+    buf.write("<div class='year-grid'>")
     
     # Header row - Project column
-    html_parts.append("<div class='y-head'>Project</div>")
+    buf.write("<div class='y-head'>Project</div>")
     
     # Month headers
     for i in range(1, months_to_display + 1):
-        html_parts.append(f"<div class='month-head'>{i:02d}</div>")
-
-    # Project rows
-    for _, row in meta_view.sort_values("Project").iterrows():
-        proj = row["Project"]
-        dept_html = dept_badge(row["Department"])
+        buf.write(f"<div class='month-head'>{i:02d}</div>")
+
+    # Project rows; one reindex over projects x months yields every cell in row order
+    grid = phase_top.reindex(pd.MultiIndex.from_product([projects_sorted["Project"], months]))
+    # Bar geometry and labels for the whole grid in a few array ops
+    mm_arr = grid["MM"].to_numpy(dtype=float, na_value=0.0)
+    height = np.maximum(20.0, np.minimum(100.0, mm_arr * (100.0 / full_height_mm)))
+    bar_values = np.where(mm_arr >= 1, mm_arr.astype(np.int64).astype(str), np.char.mod("%.1f", mm_arr))
+    cells = zip(
+        mm_arr.tolist(), grid["Phase"].tolist(), grid["Employees"].tolist(), height.tolist(), bar_values.tolist()
+    )
+    for proj, dept_name in projects_sorted.itertuples(index=False, name=None):
+        dept_html = dept_badge(dept_name)
 
-        # Project name cell with hover effect
-        html_parts.append(
+        # Project name cell with hover effect; the row's cells are joined and written once
+        row_parts = [
             f"<div class='project-name' style='height:60px;display:flex;align-items:center;justify-content:space-between;'>"
             f"<span>{proj}</span>{dept_html}"
             "</div>"
-        )
+        ]
 
         # Month bars for this project
-        for ym in months:
-            mm, phase, employees = month_mm_phase_employees(alloc, proj, ym)
-            if mm <= 0 or not phase:
-                html_parts.append("<div class='month-bar'></div>")
+        for mm, phase, employees, bar_height, bar_value in itertools.islice(cells, len(months)):
+            if mm <= 0 or pd.isna(phase):  # missing from reindex => idle
+                row_parts.append("<div class='month-bar'></div>")
                 continue
+            if pd.isna(employees):
+                employees = ""
             
-            pct = min(100.0, (mm / float(full_height_mm)) * 100.0)
-            cls = {
-                "planning": "plan",
-                "design": "design",
-                "development": "dev",
-                "testing": "test",
-                "delivery": "deliv",
-            }.get(phase.lower(), "plan")
+            cls = _PHASE_CLASS.get(phase.lower(), "plan")
             
-            bar_value = int(mm) if mm >= 1 else f"{mm:.1f}"
+            cell = {
+                'cls': cls,
+                'height': bar_height,
+                'bar_value': bar_value,
+                'proj': proj,
+                'phase': phase,
+                'tooltip': "",
+            }
             
             # Create tooltip content
-            tooltip_html = ""
             if employees:
-                # Format employee allocations nicely
-                employee_lines = ""
-                try:
-                    # Parse employees with allocations like "Name (2.0), Name2 (1.5)"
-                    emp_parts = [e.strip() for e in employees.split(',')]
-                    for emp_part in emp_parts:
-                        employee_lines += f"<div class='tooltip-value'>• {emp_part} MM</div>"
-                except:
+                # Parse employees with allocations like "Name (2.0), Name2 (1.5)"
+                matches = EMP_RE.findall(employees)
+                if matches:
+                    cell['employee_lines'] = "".join([EMP_LINE_TMPL.format(name=name.strip(), mm=mm) for name, mm in matches])
+                else:
                     # Fallback if format doesn't match
-                    employee_lines = f"<div class='tooltip-value'>{employees}</div>"
-                
-                tooltip_html = f"""
-                <span class='tooltip-text'>
-                    <div class='tooltip-label'>Project</div>
-                    <div class='tooltip-value'>{proj}</div>
-                    <div class='tooltip-divider'></div>
-                    <div class='tooltip-label'>Phase</div>
-                    <div class='tooltip-value'>{phase}</div>
-                    <div class='tooltip-divider'></div>
-                    <div class='tooltip-label'>Total Effort</div>
-                    <div class='tooltip-value'>{bar_value} MM</div>
-                    <div class='tooltip-divider'></div>
-                    <div class='tooltip-label'>Team Allocation</div>
-                    {employee_lines}
-                </span>
-                """
+                    cell['employee_lines'] = f"<div class='tooltip-value'>{employees}</div>"
+                cell['tooltip'] = TOOLTIP_TMPL.format_map(cell)
             
-            html_parts.append(
-                f"<div class='month-bar'>"
-                f"<div class='tooltip-container'>"
-                f"<div class='bar {cls}' style='height:{max(20, pct)}%'>{bar_value}</div>"
-                f"{tooltip_html}"
-                f"</div>"
-                f"</div>"
-            )
+            row_parts.append(BAR_TMPL.format_map(cell))
+        
+        buf.write("".join(row_parts))
 
-    html_parts.append("</div>")  # close year-grid
+    buf.write("</div>")  # close year-grid
+    buf.write("</div>")  # close container-card
     
-    # Render the complete grid at once
-    st.markdown("".join(html_parts), unsafe_allow_html=True)
-    
-    st.markdown("</div>", unsafe_allow_html=True)  # close container-card
+    # Render the complete card at once
+    st.markdown(buf.getvalue(), unsafe_allow_html=True)
 
 # -------------------------------
 # Dashboard Tab - Enhanced Design
 # -------------------------------
 with tab3:
-    # Add dashboard-specific CSS
-    st.markdown("""
-    <style>
-    .dash-section {
-        background: white;
-        border-radius: 12px;
-        padding: 24px;
-        margin-bottom: 24px;
-        box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-    }
-    .dash-title {
-        font-size: 20px;
-        font-weight: 700;
-        color: #1e293b;
-        margin-bottom: 8px;
-        display: flex;
-        align-items: center;
-        gap: 8px;
-    }
-    .dash-subtitle {
-        font-size: 14px;
-        color: #64748b;
-        margin-bottom: 20px;
-    }
-    .employee-grid {
-        display: grid;
-        grid-template-columns: 140px repeat(12, 1fr);
-        gap: 6px;
-        margin-bottom: 8px;
-        align-items: stretch;
-    }
-    .emp-header {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        padding: 10px 8px;
-        border-radius: 8px;
-        text-align: center;
-        font-weight: 600;
-        font-size: 12px;
-    }
-    .emp-name {
-        background: #f8fafc;
-        padding: 10px 12px;
-        border-radius: 8px;
-        font-weight: 600;
-        font-size: 13px;
-        color: #1e293b;
-        display: flex;
-        align-items: center;
-    }
-    .emp-cell {
-        background: white;
-        border: 2px solid #e2e8f0;
-        border-radius: 6px;
-        padding: 8px 6px;
-        text-align: center;
-        font-size: 11px;
-        font-weight: 700;
-        min-height: 50px;
-        display: flex;
-        flex-direction: column;
-        align-items: center;
-        justify-content: center;
-        gap: 4px;
-    }
-    .emp-cell.low { background: #f0fdf4; color: #15803d; border-color: #86efac; }
-    .emp-cell.medium { background: #fef3c7; color: #b45309; border-color: #fcd34d; }
-    .emp-cell.high { background: #fee2e2; color: #b91c1c; border-color: #fca5a5; }
-    .emp-cell.over { background: #dc2626; color: white; border-color: #991b1b; box-shadow: 0 0 0 3px rgba(220, 38, 38, 0.2); }
-    .emp-proj {
-        font-size: 9px;
-        background: rgba(0, 0, 0, 0.1);
-        padding: 2px 5px;
-        border-radius: 3px;
-        font-weight: 600;
-        white-space: nowrap;
-    }
-    .emp-cell.over .emp-proj {
-        background: rgba(255,255,255,0.3);
-    }
-    .legend {
-        display: flex;
-        gap: 16px;
-        font-size: 12px;
-        margin-top: 12px;
-        flex-wrap: wrap;
-    }
-    .legend-item {
-        display: flex;
-        align-items: center;
-        gap: 6px;
-    }
-    .legend-box {
-        width: 16px;
-        height: 16px;
-        border-radius: 3px;
-        border: 2px solid;
-    }
-    .summary-grid {
-        display: grid;
-        grid-template-columns: repeat(3, 1fr);
-        gap: 20px;
-    }
-    .summary-card {
-        background: white;
-        border: 1px solid #e2e8f0;
-        border-radius: 12px;
-        padding: 20px;
-    }
-    .summary-card h4 {
-        font-size: 16px;
-        font-weight: 600;
-        color: #334155;
-        margin-bottom: 16px;
-    }
-    .metric-row {
-        display: grid;
-        grid-template-columns: repeat(2, 1fr);
-        gap: 12px;
-        margin-bottom: 12px;
-    }
-    .metric-box {
-        background: #f8fafc;
-        padding: 14px;
-        border-radius: 8px;
-        border: 1px solid #e2e8f0;
-    }
-    .metric-label {
-        font-size: 11px;
-        color: #64748b;
-        text-transform: uppercase;
-        letter-spacing: 0.5px;
-        margin-bottom: 4px;
-    }
-    .metric-value {
-        font-size: 28px;
-        font-weight: 700;
-        color: #1e293b;
-        line-height: 1;
-    }
-    .metric-change {
-        font-size: 11px;
-        margin-top: 4px;
-    }
-    .metric-change.up { color: #10b981; }
-    .metric-change.down { color: #ef4444; }
-    </style>
-    """, unsafe_allow_html=True)
-    
     # Calculate dashboard metrics
     all_months = yms(st.session_state.get('start_ym', start_ym), 12)
     
@@ -1184,36 +1411,7 @@ with tab3:
     st.markdown("<div class='dash-title'>⚠️ Resource Conflicts & Overallocation</div>", unsafe_allow_html=True)
     
     # Extract all employees and check for conflicts
-    conflicts = []
-    employee_allocations = {}
-    
-    for _, row in alloc.iterrows():
-        if pd.notna(row.get('Employees', '')) and row['Employees']:
-            try:
-                emp_parts = [e.strip() for e in str(row['Employees']).split(',')]
-                for emp_part in emp_parts:
-                    if '(' in emp_part and ')' in emp_part:
-                        name = emp_part.split('(')[0].strip()
-                        mm = float(emp_part.split('(')[1].split(')')[0])
-                        
-                        key = (name, row['Date'])
-                        if key not in employee_allocations:
-                            employee_allocations[key] = {'total_mm': 0, 'projects': []}
-                        employee_allocations[key]['total_mm'] += mm
-                        employee_allocations[key]['projects'].append((row['Project'], mm))
-            except:
-                pass
-    
-    # Find conflicts (>100% = 4.0 MM per month assuming 4 weeks)
-    for (emp, date), data in employee_allocations.items():
-        if data['total_mm'] > 4.0:
-            conflicts.append({
-                'employee': emp,
-                'month': date,
-                'total_mm': data['total_mm'],
-                'percent': (data['total_mm'] / 4.0) * 100,
-                'projects': data['projects']
-            })
+    employee_allocations, conflicts, all_employees = _employee_allocations(alloc)
     
     if conflicts:
         for conflict in conflicts:
@@ -1229,70 +1427,37 @@ with tab3:
     st.markdown("<div class='dash-title'>👥 Resource Utilization - Individual Employee Workload</div>", unsafe_allow_html=True)
     st.markdown("<div class='dash-subtitle'>Track individual workload across projects. Red cells indicate overallocation (>100%).</div>", unsafe_allow_html=True)
     
-    # Get unique employees
-    all_employees = set()
-    for _, row in alloc.iterrows():
-        if pd.notna(row.get('Employees', '')) and row['Employees']:
-            try:
-                emp_parts = [e.strip() for e in str(row['Employees']).split(',')]
-                for emp_part in emp_parts:
-                    if '(' in emp_part:
-                        name = emp_part.split('(')[0].strip()
-                        all_employees.add(name)
-            except:
-                pass
-    
     # Build ONE complete grid with header and all employees
-    grid_html = ["<div class='employee-grid' style='grid-template-rows: auto;'>"]
+    grid_buf = io.StringIO()
+    grid_buf.write("<div class='employee-grid' style='grid-template-rows: auto;'>")
     
     # Header row
-    grid_html.append("<div class='emp-header'>Employee</div>")
+    grid_buf.write("<div class='emp-header'>Employee</div>")
     month_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
     for month_name in month_names:
-        grid_html.append(f"<div class='emp-header'>{month_name}</div>")
+        grid_buf.write(f"<div class='emp-header'>{month_name}</div>")
+    
+    # Employee x month utilization, classified in one vectorized pass
+    cell_data = [[employee_allocations.get((employee, month)) for month in all_months] for employee in all_employees]
+    month_mm = np.array([[data['total_mm'] if data else 0.0 for data in row] for row in cell_data]).reshape(len(all_employees), len(all_months))
+    pct = (month_mm / 4.0) * 100
+    cell_class = np.digitize(pct, UTIL_BINS)
     
     # All employee rows in the same grid
-    for employee in sorted(all_employees):
-        grid_html.append(f"<div class='emp-name'>{employee}</div>")
+    for employee, row, row_pct, row_class in zip(all_employees, cell_data, pct, cell_class):
+        row_parts = [f"<div class='emp-name'>{employee}</div>"]
         
-        for month in all_months:
+        for data, p_cell, c_cell in zip(row, row_pct.tolist(), row_class.tolist()):
             # Get full project names (not just 3 letters)
-            month_mm = 0
-            projects = []
-            for (emp, date), data in employee_allocations.items():
-                if emp == employee and date == month:
-                    month_mm = data['total_mm']
-                    projects = [p[0] for p in data['projects'][:2]]  # Full project names
-            
-            pct = (month_mm / 4.0) * 100
-            
-            if pct == 0:
-                cell_class = ""
-                text = "0%"
-            elif pct < 50:
-                cell_class = "low"
-                text = f"{pct:.0f}%"
-            elif pct < 75:
-                cell_class = "medium"
-                text = f"{pct:.0f}%"
-            elif pct <= 100:
-                cell_class = "high"
-                text = f"{pct:.0f}%"
-            else:
-                cell_class = "over"
-                text = f"{pct:.0f}%"
-            
+            projects = [p[0] for p in data['projects'][:2]] if data else []  # Full project names
             proj_tags = " ".join([f"<span class='emp-proj'>{p}</span>" for p in projects])
-            
-            grid_html.append(
-                f"<div class='emp-cell {cell_class}'>"
-                f"<span style='font-weight:700;'>{text}</span>{proj_tags}"
-                f"</div>"
-            )
+            row_parts.append(EMP_CELL_TMPL.format(cls=UTIL_CLASSES[c_cell], text=f"{p_cell:.0f}%", proj_tags=proj_tags))
+        
+        grid_buf.write("".join(row_parts))
     
-    grid_html.append("</div>")  # Close the single grid
+    grid_buf.write("</div>")  # Close the single grid
     
-    st.markdown("".join(grid_html), unsafe_allow_html=True)
+    st.markdown(grid_buf.getvalue(), unsafe_allow_html=True)
     
     # Legend
     st.markdown("""
@@ -1322,22 +1487,17 @@ with tab3:
     st.markdown("<div class='dash-section'>", unsafe_allow_html=True)
     st.markdown("<div class='dash-title'>📊 Capacity Planning - Total Resource Demand</div>", unsafe_allow_html=True)
     
-    # Calculate total MM by month
-    capacity_data = []
-    for month in all_months[:6]:
-        month_total = alloc[alloc['Date'] == month]['MM'].sum()
-        capacity_data.append({
-            'month': month,
-            'total_mm': month_total,
-            'available': 40
-        })
+    # Calculate total MM by month; one cached groupby feeds capacity, trend and metrics
+    monthly_sum = _monthly_sum(alloc)
+    monthly_totals = _monthly_totals(monthly_sum, all_months[:6])
+    capacity_data = _capacity(monthly_totals, all_months[:6])
     
     # Render capacity grid
     capacity_html = ["<div style='display:grid;grid-template-columns:150px repeat(6,1fr);gap:8px;align-items:center;margin:20px 0;'>"]
     capacity_html.append("<div style='background:linear-gradient(135deg,#667eea 0%,#764ba2 100%);color:white;padding:12px;border-radius:8px;font-weight:600;text-align:center;'>Month</div>")
     
     for data in capacity_data:
-        month_label = data['month'].split('-')[1]
+        month_label = data['month'][5:7]  # "YYYY-MM" -> "MM"
         capacity_html.append(f"<div style='background:#eef2ff;color:#4338ca;padding:12px;border-radius:8px;font-weight:700;text-align:center;'>{month_label}</div>")
     
     capacity_html.append("<div style='background:#eef2ff;color:#1f2b6b;padding:12px;border-radius:8px;font-weight:700;'>Total Demand</div>")
@@ -1385,68 +1545,23 @@ with tab3:
         dept_totals = meta_view.groupby('Department')['Total_MM'].sum()
         total_mm = dept_totals.sum()
         
-        # Create pie chart
-        import plotly.graph_objects as go
-        
-        colors = ['#667eea', '#3b82f6', '#10b981']
-        fig = go.Figure(data=[go.Pie(
-            labels=dept_totals.index,
-            values=dept_totals.values,
-            hole=0.5,
-            marker=dict(colors=colors),
-            textinfo='label+percent',
-            textfont=dict(size=12, color='white'),
-            hovertemplate='<b>%{label}</b><br>%{value} MM<br>%{percent}<extra></extra>'
-        )])
-        
-        fig.update_layout(
-            showlegend=True,
-            height=250,
-            margin=dict(l=0, r=0, t=0, b=0),
-            legend=dict(
-                orientation="v",
-                yanchor="middle",
-                y=0.5,
-                xanchor="left",
-                x=1.1
-            )
-        )
+        # Pie chart from the session's template; only the trace data changes
+        fig = chart_template("pie")
+        fig.data[0].labels = dept_totals.index
+        fig.data[0].values = dept_totals.values
         
         st.plotly_chart(fig, use_container_width=True)
     
     with col2:
         st.markdown("**Total Effort Trend (MM)**")
         
-        # Calculate monthly totals for trend
-        monthly_totals = []
-        month_labels = []
-        for i, month in enumerate(all_months[:6]):
-            month_total = alloc[alloc['Date'] == month]['MM'].sum()
-            monthly_totals.append(month_total)
-            month_labels.append(month.split('-')[1])
+        # Monthly totals for trend (computed with capacity above)
+        month_labels = [month[5:7] for month in all_months[:6]]
         
-        # Create line chart
-        fig = go.Figure()
-        
-        fig.add_trace(go.Scatter(
-            x=month_labels,
-            y=monthly_totals,
-            mode='lines+markers',
-            line=dict(color='#667eea', width=3),
-            marker=dict(size=8, color='#667eea'),
-            fill='tonexty',
-            fillcolor='rgba(102, 126, 234, 0.1)',
-            hovertemplate='<b>Month %{x}</b><br>%{y:.0f} MM<extra></extra>'
-        ))
-        
-        fig.update_layout(
-            height=250,
-            margin=dict(l=0, r=0, t=0, b=0),
-            xaxis=dict(title='', showgrid=True, gridcolor='#f1f5f9'),
-            yaxis=dict(title='', showgrid=True, gridcolor='#f1f5f9'),
-            plot_bgcolor='white',
-            hovermode='x unified'
-        )
+        # Line chart from the session's template; only the trace data changes
+        fig = chart_template("trend")
+        fig.data[0].x = month_labels
+        fig.data[0].y = monthly_totals
         
         st.plotly_chart(fig, use_container_width=True)
     
@@ -1454,8 +1569,7 @@ with tab3:
         st.markdown("**Key Metrics**")
         
         # Calculate metrics
-        recent_months = alloc[alloc['Date'].isin(all_months[:3])]
-        avg_monthly = recent_months.groupby('Date')['MM'].sum().mean()
+        avg_monthly = monthly_sum.reindex(all_months[:3]).mean()
         high_util_employees = len(conflicts)
         
         # Create metric boxes with custom HTML